@@ -1,18 +1,42 @@
 from flask import Flask, jsonify
+from flask.json.provider import JSONProvider
 from flasgger import Swagger
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
+import orjson
 import os
 from werkzeug.exceptions import HTTPException
 
 db = SQLAlchemy()
 
+
+class OrjsonProvider(JSONProvider):
+    """
+    Proveedor JSON basado en orjson: serializa en código nativo y devuelve
+    bytes directamente, lo que reduce el costo de CPU en respuestas grandes.
+    OPT_NON_STR_KEYS permite serializar diccionarios con claves enteras.
+    """
+
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self._OPTIONS)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 def create_app():
     """
     Fábrica de aplicaciones Flask. Configura y devuelve la instancia de la aplicación.
     """
     app = Flask(__name__)
-    
+
+    # Usar orjson para toda la (de)serialización JSON, incluido jsonify
+    app.json = OrjsonProvider(app)
+
+    # Aceptar '/recurso' y '/recurso/' sin pagar la redirección 308
+    app.url_map.strict_slashes = False
+
     # Cargar variables de entorno desde el archivo .env
     load_dotenv()
 
@@ -69,6 +93,11 @@ Puedes filtrar los recursos usando parámetros en la URL con sufijos especiales:
     from .routes import api
     app.register_blueprint(api)
 
+    # Profiling ligero por endpoint, opcional vía .env (ENABLE_PROFILER=1)
+    if os.getenv("ENABLE_PROFILER", "").lower() in ("1", "true", "yes"):
+        from .profiling import init_profiler
+        init_profiler(app)
+
     @app.errorhandler(HTTPException)
     def handle_exception(e):
         """Asegura que todos los errores HTTP devuelvan JSON en lugar de HTML."""
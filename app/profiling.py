@@ -0,0 +1,50 @@
+"""
+Middleware ligero de profiling por endpoint.
+
+Se activa con ENABLE_PROFILER=1 en el entorno (o .env). Acumula por endpoint
+el número de peticiones y el tiempo total/máximo de respuesta, y expone el
+agregado en GET /__profile__ para localizar los hot paths reales antes de
+seguir micro-optimizando. El costo por petición se limita a dos lecturas de
+time.perf_counter().
+"""
+from flask import g, jsonify, request
+import time
+
+# endpoint -> [peticiones, segundos acumulados, segundos máximos]
+_stats = {}
+
+
+def init_profiler(app):
+    """Registra los hooks de medición y el endpoint de consulta de stats."""
+
+    @app.before_request
+    def _start_timer():
+        g._profile_start = time.perf_counter()
+
+    @app.after_request
+    def _record_timing(response):
+        start = g.get('_profile_start')
+        if start is not None and request.endpoint:
+            elapsed = time.perf_counter() - start
+            entry = _stats.get(request.endpoint)
+            if entry is None:
+                _stats[request.endpoint] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+        return response
+
+    @app.route('/__profile__')
+    def profile_stats():
+        """Devuelve las métricas agregadas por endpoint (count/avg/max en ms)."""
+        return jsonify({
+            endpoint: {
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "avg_ms": round(total * 1000 / count, 3),
+                "max_ms": round(peak * 1000, 3),
+            }
+            for endpoint, (count, total, peak) in _stats.items()
+        })
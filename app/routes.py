@@ -1,5 +1,9 @@
-from flask import Blueprint, request, jsonify, abort, g
+from flask import Blueprint, Response, request, jsonify, abort, g
+from functools import lru_cache
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.attributes import flag_modified
 from app import db
+import orjson
 import time
 import logging
 import os
@@ -11,6 +15,78 @@ logger = logging.getLogger(__name__)
 DEFAULT_GLOBAL_DELAY_SECONDS = float(os.getenv("DEFAULT_GLOBAL_DELAY", 0.5))
 MAX_GLOBAL_DELAY_SECONDS = float(os.getenv("MAX_GLOBAL_DELAY", 120))
 
+# Respuesta 204 pre-construida: los DELETE exitosos la devuelven tal cual,
+# sin pagar la construcción de un Response nuevo en cada petición
+_EMPTY_204 = Response(status=204, mimetype='application/json')
+
+# Métodos HTTP cuyo cuerpo JSON interesa pre-procesar en before_request
+_METHODS_WITH_BODY = frozenset({'POST', 'PUT', 'PATCH'})
+
+# Métodos que no ejecutan lógica de vista (preflight CORS, sondas de salud):
+# no pagan latencia simulada ni parseo de JSON
+_PASSTHROUGH_METHODS = frozenset({'OPTIONS', 'HEAD'})
+
+# Parámetros de query reservados (no se interpretan como filtros dinámicos)
+# y operadores de comparación numérica soportados en los sufijos de filtro
+_RESERVED_PARAMS = frozenset({'page', 'limit', '__delay'})
+_RANGE_OPS = frozenset({'gt', 'gte', 'lt', 'lte'})
+
+# Clave reservada bajo la que se versiona la lista completa de recursos
+_RESOURCE_LIST_KEY = '__resource_list__'
+
+
+# Contadores de versión por recurso, persistidos junto a los datos que
+# versionan para que todos los workers compartan la misma invalidación
+class ResourceVersion(db.Model):
+    __tablename__ = 'resource_versions'
+    resource_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class _CacheState:
+    """
+    Acceso a los contadores de versión que invalidan las cachés de lectura.
+    Los contadores viven en la tabla 'resource_versions' de la base de datos
+    compartida: una escritura atendida por cualquier worker incrementa la
+    versión que los demás leen, así que ninguna caché local sobrevive a una
+    escritura hecha en otro proceso. Leer la versión cuesta un SELECT por
+    clave primaria, muy por debajo de reconstruir y serializar la página;
+    las entradas cacheadas con versiones viejas dejan de consultarse y la
+    LRU las expulsa.
+    """
+    __slots__ = ()
+
+    def version(self, resource_name):
+        row = db.session.query(ResourceVersion.version) \
+            .filter_by(resource_name=resource_name).first()
+        return row[0] if row else 0
+
+    @property
+    def list_version(self):
+        return self.version(_RESOURCE_LIST_KEY)
+
+    def bump(self, resource_name):
+        # Solo prepara el incremento: se llama antes del commit de la
+        # escritura que invalida, de modo que el dato nuevo y la nueva
+        # versión se publican en la misma transacción. El UPSERT de
+        # Postgres hace el insertar-o-incrementar de forma atómica, sin
+        # carrera entre dos primeras escrituras concurrentes sobre la
+        # misma clave
+        for name in (resource_name, _RESOURCE_LIST_KEY):
+            # Cualquier escritura puede alterar el conjunto de recursos
+            # visibles (primer item creado, último borrado, renombrado)
+            db.session.execute(
+                pg_insert(ResourceVersion)
+                .values(resource_name=name, version=1)
+                .on_conflict_do_update(
+                    index_elements=['resource_name'],
+                    set_={'version': ResourceVersion.version + 1}
+                )
+            )
+
+
+_cache_state = _CacheState()
+
 # Modelo de base de datos para items dinámicos
 class Item(db.Model):
     __tablename__ = 'items'
@@ -19,7 +95,13 @@ class Item(db.Model):
     data = db.Column(db.JSON, nullable=False)
 
     def to_dict(self):
-        item = self.data.copy()
+        # El '_id' se guarda dentro del propio JSON al escribir, así que la
+        # lectura devuelve el dict tal cual, sin copia por item
+        data = self.data
+        if data.get('_id') == self.id:
+            return data
+        # Filas antiguas sin '_id' embebido: conservar el comportamiento previo
+        item = data.copy()
         item['_id'] = self.id
         return item
 
@@ -28,9 +110,23 @@ def handle_global_delay_and_json_body():
     """
     Maneja la latencia simulada global (parámetro __delay) y pre-procesa el cuerpo JSON.
     """
-    # 1. Manejo de Latencia
+    g.json_data = None
+
+    # 0. Atajo para OPTIONS/HEAD: nada que simular ni que parsear
+    if request.method in _PASSTHROUGH_METHODS:
+        return
+
+    # 1. Camino rápido combinado para GET sin query string (el caso más
+    # frecuente): no hay __delay que leer ni cuerpo JSON que procesar, así
+    # que ni siquiera se materializa el MultiDict de request.args
+    if request.method == 'GET' and not request.query_string:
+        if DEFAULT_GLOBAL_DELAY_SECONDS > 0 and not request.path.startswith('/simulate/'):
+            time.sleep(DEFAULT_GLOBAL_DELAY_SECONDS)
+        return
+
+    # 2. Manejo de Latencia
     requested_delay = request.args.get('__delay', type=float)
-    
+
     if requested_delay is not None:
         # Prioridad: Parámetro __delay explícito (permite 0 para desactivar)
         actual_delay = max(0.0, min(requested_delay, MAX_GLOBAL_DELAY_SECONDS))
@@ -41,10 +137,14 @@ def handle_global_delay_and_json_body():
         if DEFAULT_GLOBAL_DELAY_SECONDS > 0:
             time.sleep(DEFAULT_GLOBAL_DELAY_SECONDS)
 
-    # 2. Procesamiento de JSON
-    g.json_data = None
-    if request.is_json:
-        g.json_data = request.get_json(silent=True)
+    # 3. Procesamiento de JSON: solo los métodos con cuerpo pagan el parseo.
+    # Comprobar Content-Length primero evita el sniff de mimetype de is_json
+    # cuando la petición llega explícitamente vacía; None (longitud
+    # desconocida, p.ej. Transfer-Encoding: chunked) sí sigue al parseo
+    if request.method in _METHODS_WITH_BODY and request.content_length != 0 and request.is_json:
+        # cache=True conserva el resultado en el objeto request por si una
+        # vista vuelve a llamar a get_json; silent=True evita el 400 automático
+        g.json_data = request.get_json(force=False, silent=True, cache=True)
 
 @api.route('/', methods=['GET'])
 def list_resources():
@@ -62,9 +162,20 @@ def list_resources():
                 items:
                     type: string
     """
-    # Obtener nombres de recursos únicos desde la base de datos
+    return Response(_render_resource_list(_cache_state.list_version),
+                    mimetype='application/json')
+
+
+@lru_cache(maxsize=2)
+def _render_resource_list(version):
+    """
+    Lista de nombres de recursos serializada. La versión de la clave es el
+    contador '__resource_list__' de la tabla compartida, que cualquier
+    escritura en cualquier worker incrementa: crear, renombrar o vaciar una
+    colección en otro proceso invalida también esta caché.
+    """
     resource_names = [r[0] for r in db.session.query(Item.resource_name).distinct().all()]
-    return jsonify(resource_names)
+    return orjson.dumps(resource_names)
 
 @api.route('/<resource_name>', methods=['PUT'])
 def rename_resource(resource_name):
@@ -103,8 +214,10 @@ def rename_resource(resource_name):
     new_name = g.json_data['new_name']
     
     updated_count = Item.query.filter_by(resource_name=resource_name).update({Item.resource_name: new_name})
+    _cache_state.bump(resource_name)
+    _cache_state.bump(new_name)
     db.session.commit()
-    
+
     if updated_count == 0:
         abort(404, description=f"Resource '{resource_name}' not found")
         
@@ -130,12 +243,31 @@ def delete_resource(resource_name):
     """
     # The delete() method performs a bulk delete without loading objects into memory.
     Item.query.filter_by(resource_name=resource_name).delete()
+    _cache_state.bump(resource_name)
     db.session.commit()
     # A 204 No Content response is appropriate for a successful DELETE.
-    return '', 204
+    return _EMPTY_204
 
 # ================= CRUD Dinámico =================
 
+def _get_item_or_404(resource_name, item_id):
+    """
+    Busca un item por clave primaria y valida su colección; aborta con 404
+    si no existe. db.session.get consulta primero el identity map de la
+    sesión antes de emitir SQL, y el resultado se memoriza en g para que
+    búsquedas repetidas dentro de la misma petición sean gratuitas.
+    """
+    key = (resource_name, item_id)
+    cached = g.get('_item_lookup')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    item = db.session.get(Item, item_id)
+    if item is None or item.resource_name != resource_name:
+        abort(404, description=f"Item with id {item_id} not found in resource '{resource_name}'")
+    g._item_lookup = (key, item)
+    return item
+
 @api.route('/<resource_name>', methods=['POST'])
 def create_item(resource_name):
     """
@@ -184,10 +316,57 @@ def create_item(resource_name):
     
     new_item = Item(resource_name=resource_name, data=g.json_data)
     db.session.add(new_item)
+    db.session.flush()  # asigna el id autoincremental antes del commit
+    new_item.data = {**g.json_data, '_id': new_item.id}
+    _cache_state.bump(resource_name)
     db.session.commit()
-    
+
     return jsonify(new_item.to_dict()), 201
 
+@lru_cache(maxsize=512)
+def _count_items(resource_name, version):
+    """Total de items de un recurso, cacheado hasta la próxima escritura."""
+    return db.session.query(db.func.count(Item.id)) \
+        .filter(Item.resource_name == resource_name).scalar()
+
+
+@lru_cache(maxsize=512)
+def _render_page(resource_name, page, limit, version):
+    """
+    Construye y serializa una página sin filtros de una colección.
+    El parámetro 'version' forma parte de la clave de caché: cualquier
+    escritura sobre el recurso lo incrementa, por lo que las páginas
+    cacheadas quedan invalidadas sin necesidad de limpieza explícita.
+    """
+    # LIMIT/OFFSET directo: leer la página K cuesta O(limit) y el COUNT
+    # se reutiliza entre páginas gracias a la caché por versión
+    total = _count_items(resource_name, version)
+    # Traer solo (id, data) como tuplas evita instanciar objetos Item
+    # completos (y su registro en el identity map) por cada fila
+    rows = db.session.query(Item.id, Item.data) \
+        .filter(Item.resource_name == resource_name) \
+        .order_by(Item.id) \
+        .offset((page - 1) * limit).limit(limit)
+
+    data = []
+    for item_id, item_data in rows:
+        if item_data.get('_id') != item_id:
+            # Fila antigua sin '_id' embebido
+            item_data = {**item_data, '_id': item_id}
+        data.append(item_data)
+
+    response = {
+        "data": data,
+        "meta": {
+            "total_items": total,
+            "per_page": limit,
+            "current_page": page,
+            "total_pages": -(-total // limit)  # ceil-div sin pasar por float
+        }
+    }
+    return orjson.dumps(response)
+
+
 @api.route('/<resource_name>', methods=['GET'])
 def get_items(resource_name):
     """
@@ -251,22 +430,29 @@ def get_items(resource_name):
                         type: string
                         example: "Los parámetros 'page' y 'limit' deben ser números enteros."
     """
-    # Leer parámetros de paginación de la URL
+    # Leer parámetros de paginación de la URL (una sola resolución de
+    # request.args para toda la vista)
+    args = request.args
     try:
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
+        page = int(args.get('page', 1))
+        limit = int(args.get('limit', 20))
         if page < 1 or limit < 1:
             raise ValueError()
     except (ValueError, TypeError):
         abort(400, description="Los parámetros 'page' y 'limit' deben ser números enteros positivos.")
 
+    # Camino rápido: sin filtros dinámicos la página se sirve desde la caché
+    # LRU, pre-serializada como bytes (las escrituras la invalidan vía versión)
+    if all(key in _RESERVED_PARAMS for key in args):
+        body = _render_page(resource_name, page, limit, _cache_state.version(resource_name))
+        return Response(body, mimetype='application/json')
+
     # Construir la consulta base
     query = Item.query.filter_by(resource_name=resource_name)
 
     # Aplicar filtros dinámicos basados en los parámetros de la URL
-    reserved_params = ['page', 'limit']
-    for key, value in request.args.items():
-        if key in reserved_params:
+    for key, value in args.items():
+        if key in _RESERVED_PARAMS:
             continue
 
         # Separar el nombre del campo y el operador (ej. 'precio__gt')
@@ -282,7 +468,7 @@ def get_items(resource_name):
         elif op == 'ilike':
             # Búsqueda de texto parcial, insensible a mayúsculas/minúsculas
             query = query.filter(json_field_as_text.ilike(f'%{value}%'))
-        elif op in ['gt', 'gte', 'lt', 'lte']:
+        elif op in _RANGE_OPS:
             try:
                 # Para comparaciones numéricas, debemos convertir el campo y el valor
                 numeric_value = float(value)
@@ -300,24 +486,52 @@ def get_items(resource_name):
                 # Si el valor no es un número, ignoramos este filtro para evitar un error.
                 pass
 
-    pagination = query.paginate(
-        page=page, per_page=limit, error_out=False
-    )
-    
-    paginated_items = [item.to_dict() for item in pagination.items]
+    # Igual que en el camino sin filtros: proyectar (id, data) como tuplas
+    # en lugar de materializar objetos Item completos por fila
+    total = query.count()
+    rows = query.with_entities(Item.id, Item.data) \
+        .order_by(Item.id) \
+        .offset((page - 1) * limit).limit(limit)
+
+    paginated_items = []
+    for item_id, item_data in rows:
+        if item_data.get('_id') != item_id:
+            item_data = {**item_data, '_id': item_id}
+        paginated_items.append(item_data)
 
     response = {
         "data": paginated_items,
         "meta": {
-            "total_items": pagination.total,
-            "per_page": pagination.per_page,
-            "current_page": pagination.page,
-            "total_pages": pagination.pages
+            "total_items": total,
+            "per_page": limit,
+            "current_page": page,
+            "total_pages": -(-total // limit)
         }
     }
-    
+
     return jsonify(response)
 
+@lru_cache(maxsize=2048)
+def _render_item(resource_name, item_id, version):
+    """
+    Serializa un item individual, cacheado hasta la próxima escritura sobre
+    el recurso. La versión que forma parte de la clave sale de la tabla
+    'resource_versions' compartida, así que una escritura hecha por
+    cualquier worker invalida esta caché en todos los procesos. Devuelve
+    None si el item no existe; ese 404 cacheado también queda invalidado
+    cuando el item se crea después, porque el POST incrementa la versión.
+    """
+    row = db.session.query(Item.id, Item.data) \
+        .filter(Item.resource_name == resource_name, Item.id == item_id).first()
+    if row is None:
+        return None
+    item_id, item_data = row
+    if item_data.get('_id') != item_id:
+        # Fila antigua sin '_id' embebido
+        item_data = {**item_data, '_id': item_id}
+    return orjson.dumps(item_data)
+
+
 @api.route('/<resource_name>/<int:item_id>', methods=['GET'])
 def get_item(resource_name, item_id):
     """
@@ -349,10 +563,10 @@ def get_item(resource_name, item_id):
         404:
             description: Item no encontrado
     """
-    item = Item.query.filter_by(resource_name=resource_name, id=item_id).first()
-    if item:
-        return jsonify(item.to_dict())
-    abort(404, description=f"Item with id {item_id} not found in resource '{resource_name}'")
+    body = _render_item(resource_name, item_id, _cache_state.version(resource_name))
+    if body is None:
+        abort(404, description=f"Item with id {item_id} not found in resource '{resource_name}'")
+    return Response(body, mimetype='application/json')
 
 @api.route('/<resource_name>/<int:item_id>', methods=['PUT'])
 def update_item(resource_name, item_id):
@@ -405,12 +619,12 @@ def update_item(resource_name, item_id):
     if not g.json_data:
         abort(400, description="Se esperaba un cuerpo JSON.")
     
-    item = Item.query.filter_by(resource_name=resource_name, id=item_id).first()
-    if item:
-        item.data = g.json_data
-        db.session.commit()
-        return jsonify(item.to_dict())
-    abort(404, description=f"Item with id {item_id} not found in resource '{resource_name}'")
+    item = _get_item_or_404(resource_name, item_id)
+    # Preservar el '_id' embebido al reemplazar el documento completo
+    item.data = {**g.json_data, '_id': item.id}
+    _cache_state.bump(resource_name)
+    db.session.commit()
+    return jsonify(item.to_dict())
 
 @api.route('/<resource_name>/<int:item_id>', methods=['PATCH'])
 def patch_item(resource_name, item_id):
@@ -461,17 +675,15 @@ def patch_item(resource_name, item_id):
     if not g.json_data:
         abort(400, description="Se esperaba un cuerpo JSON.")
     
-    item = Item.query.filter_by(resource_name=resource_name, id=item_id).first()
-    if item:
-        new_data = item.data.copy()
-        new_data.update(g.json_data)
-        # Forzamos a SQLAlchemy a detectar el cambio en el campo JSON
-        from sqlalchemy.orm.attributes import flag_modified
-        item.data = new_data
-        flag_modified(item, "data")
-        db.session.commit()
-        return jsonify(item.to_dict())
-    abort(404, description=f"Item with id {item_id} not found in resource '{resource_name}'")
+    item = _get_item_or_404(resource_name, item_id)
+    new_data = item.data.copy()
+    new_data.update(g.json_data)
+    # Forzamos a SQLAlchemy a detectar el cambio en el campo JSON
+    item.data = new_data
+    flag_modified(item, "data")
+    _cache_state.bump(resource_name)
+    db.session.commit()
+    return jsonify(item.to_dict())
 
 @api.route('/<resource_name>/<int:item_id>', methods=['DELETE'])
 def delete_item(resource_name, item_id):
@@ -496,15 +708,22 @@ def delete_item(resource_name, item_id):
         404:
             description: Item no encontrado
     """
-    item = Item.query.filter_by(resource_name=resource_name, id=item_id).first()
-    if item:
-        db.session.delete(item)
-        db.session.commit()
-        return '', 204
-    abort(404, description=f"Item with id {item_id} not found in resource '{resource_name}'")
+    item = _get_item_or_404(resource_name, item_id)
+    db.session.delete(item)
+    _cache_state.bump(resource_name)
+    db.session.commit()
+    return _EMPTY_204
 
 # ================= Testing & Simulation =================
 
+# Mensajes de error conocidos para la simulación (a nivel de módulo para no
+# reconstruir el dict en cada petición)
+_ERROR_MESSAGES = {
+    400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+    410: "Gone", 415: "Unsupported Media Type", 422: "Unprocessable Entity", 500: "Internal Server Error",
+    502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"
+}
+
 @api.route('/simulate/error/<int:status_code>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
 def simulate_error(status_code):
     """
@@ -525,12 +744,7 @@ def simulate_error(status_code):
         '5xx':
             description: Respuesta de error del servidor simulada.
     """
-    error_messages = {
-        400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
-        410: "Gone", 415: "Unsupported Media Type", 422: "Unprocessable Entity", 500: "Internal Server Error",
-        502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"
-    }
-    description = error_messages.get(status_code, f"Simulated Error {status_code}")
+    description = _ERROR_MESSAGES.get(status_code, f"Simulated Error {status_code}")
     abort(status_code, description=description)
 
 @api.route('/simulate/timeout/<float:duration>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
@@ -0,0 +1,23 @@
+"""
+Configuración de Gunicorn para producción.
+
+El servidor de desarrollo de Flask (run.py) atiende una sola petición a la
+vez; con gunicorn varios workers sirven peticiones en paralelo. Uso:
+
+    gunicorn -c gunicorn.conf.py run:app
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+# Varios workers son seguros con las cachés de lectura de app/routes.py:
+# sus claves de invalidación salen de la tabla 'resource_versions' en la
+# base de datos compartida, así que una escritura atendida por un worker
+# invalida las cachés LRU locales de todos los demás en su siguiente lectura
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Hilos por worker: la API duerme durante la latencia simulada (__delay),
+# así que los hilos permiten seguir atendiendo peticiones durante esos sleep
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+# Debe superar MAX_GLOBAL_DELAY para no matar workers en plena simulación
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 150))
@@ -1,7 +1,11 @@
 from app import create_app
+import os
 
 app = create_app()
 
 if __name__ == '__main__':
-    print("🚀 Dynamic Flask API with PostgreSQL DB running.")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Solo para desarrollo local. En producción usar:
+    #   gunicorn -c gunicorn.conf.py run:app
+    # El debugger/reloader se desactiva con FLASK_DEBUG=0 en el entorno
+    print("🚀 Dynamic Flask API with PostgreSQL DB running (dev server).")
+    app.run(debug=os.getenv('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)